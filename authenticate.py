@@ -1,147 +1,187 @@
-import csv
+import mmap
+import os
 import re
+import sys
 from collections import defaultdict
+from functools import lru_cache
 
+import pandas as pd
+from rapidfuzz import fuzz, process, utils
+
+try:
+    import hyperscan
+except ImportError:  # Optional: fall back to scanning with re
+    hyperscan = None
+
+# Price per guest, in cents
+PRICE_PER_GUEST_CENTS = 500
+
+# Minimum token_set_ratio score for a payment name to count as a guest's payment
+MATCH_SCORE_CUTOFF = 85
+
+# Pattern to match payment amounts
+# Look for patterns like "Name paid you $X.00" or "BofA: Name sent you $X.00"
+# Whitespace inside a match is limited to spaces/tabs so it never spans lines
+PAYMENT_RE = re.compile(rb"(?:BofA:[ \t]+)?([A-Za-z][A-Za-z \t']+?)[ \t]+(?:paid|sent)[ \t]+you[ \t]+\$(\d+\.?\d*)", re.IGNORECASE)
+
+# Same pattern compiled to a Hyperscan database, used to locate matches when available
+if hyperscan is not None:
+    PAYMENT_DB = hyperscan.Database()
+    PAYMENT_DB.compile(expressions=[PAYMENT_RE.pattern], ids=[1], flags=[hyperscan.HS_FLAG_SOM_LEFTMOST | hyperscan.HS_FLAG_CASELESS])
+else:
+    PAYMENT_DB = None
+
+# Read buffer size for input files
+READ_BUFFER_SIZE = 1 << 16
+
+@lru_cache(maxsize=None)
 def normalize_name(name):
-    """Normalize name for comparison (lowercase, strip spaces)"""
-    return name.strip().lower()
+    """Normalize name for comparison (casefold, strip spaces, interned)"""
+    return sys.intern(name.strip().casefold())
 
-def parse_payments(payments_file):
-    """Parse payments from payments.txt and return a dict of name -> amount"""
-    payments = {}
-    total_payments  = 0.0
+def first_word(name):
+    """First word of a name after fuzzy-match preprocessing (e.g. "anushka's +1" -> "anushka")"""
+    processed = utils.default_process(name)
+    return processed.split(None, 1)[0] if processed else processed
+
+def find_payment_matches(buffer):
+    """Yield every PAYMENT_RE match in buffer, using Hyperscan to find them if available"""
+    if PAYMENT_DB is None:
+        yield from PAYMENT_RE.finditer(buffer)
+        return
     
-    with open(payments_file, 'r') as f:
-        lines = f.readlines()
+    # Hyperscan reports every end offset (e.g. "$5", "$5.0", "$5.00"), so keep
+    # the longest match for each start offset
+    spans = {}
     
-    # Pattern to match payment amounts
-    # Look for patterns like "Name paid you $X.00" or "Name sent you $X.00"
-    # Handle tabs, spaces, and BofA prefix, capture names with multiple words
-    for line in lines:
-
-        
-        # Strip whitespace including tabs
-        line = line.strip()
-        if not line:
-            continue
-            
-        # Skip lines that are just separators or headers (like "86753:")
-        if line.endswith(':') and 'paid' not in line.lower() and 'sent' not in line.lower():
-            continue
-        
-        # Try "paid you" pattern
-        match = re.search(r'([A-Za-z][A-Za-z\s\']+?)\s+paid\s+you\s+\$(\d+\.?\d*)', line, re.IGNORECASE)
-        if match:
-            name = match.group(1).strip()
-            amount = float(match.group(2))
-            normalized_name = normalize_name(name)
-            total_payments += amount
-            if normalized_name in payments:
-                payments[normalized_name] += amount
-            else:
-                payments[normalized_name] = amount
-            continue
-        
-        # Try "sent you" pattern (with optional BofA: prefix)
-        match = re.search(r'(?:BofA:\s+)?([A-Za-z][A-Za-z\s\']+?)\s+sent\s+you\s+\$(\d+\.?\d*)', line, re.IGNORECASE)
+    def on_match(match_id, start, end, flags, context):
+        if end > spans.get(start, -1):
+            spans[start] = end
+    
+    PAYMENT_DB.scan(buffer, match_event_handler=on_match)
+    
+    # Extract the groups from each (short) matched span
+    for start in sorted(spans):
+        match = PAYMENT_RE.match(buffer, start, spans[start])
         if match:
-            name = match.group(1).strip()
-            amount = float(match.group(2))
+            yield match
+
+def iter_payment_matches(buffer):
+    """Yield the first PAYMENT_RE match on each line of buffer"""
+    # Only the first payment on a line counts, anything after it is memo text
+    line_end = -1
+    for match in find_payment_matches(buffer):
+        if match.start() > line_end:
+            yield match
+            line_end = buffer.find(b'\n', match.end())
+            if line_end < 0:
+                return
+
+def parse_payments(payments_file):
+    """Parse payments from payments.txt and return a dict of name -> amount in cents"""
+    payments = defaultdict(int)
+    total_payments  = 0
+    
+    # Scan the whole file in one pass over a read-only memory map
+    if os.path.getsize(payments_file) == 0:
+        return dict(payments), total_payments
+    
+    with open(payments_file, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        for match in iter_payment_matches(mm):
+            name = match.group(1).decode('utf-8', 'replace').strip()
+            amount = int(round(float(match.group(2)) * 100))
             normalized_name = normalize_name(name)
             total_payments += amount
-            if normalized_name in payments:
-                payments[normalized_name] += amount
-            else:
-                payments[normalized_name] = amount
-            continue
+            payments[normalized_name] += amount
     
-    return payments, total_payments
+    # Return a plain dict so lookups downstream never insert missing names
+    return dict(payments), total_payments
 
 def main():
     # Read whitelist
-    with open('whitelist.txt', 'r') as f:
-        whitelist = {normalize_name(line.strip()) for line in f if line.strip()}
+    with open('whitelist.txt', 'r', buffering=READ_BUFFER_SIZE) as f:
+        whitelist = {normalize_name(line) for line in f if line.strip()}
     
     # Read no_pay list (guests who don't have to pay)
-    with open('no_pay.txt', 'r') as f:
-        no_pay = {normalize_name(line.strip()) for line in f if line.strip()}
+    with open('no_pay.txt', 'r', buffering=READ_BUFFER_SIZE) as f:
+        no_pay = {normalize_name(line) for line in f if line.strip()}
     
     # Initialize lists
-    blacklist = []
-    guest_structure = defaultdict(list)  # main guest normalized -> list of plus ones
+    guest_structure = {}  # main guest normalized -> list of plus ones
+    guest_structure_norm = {}  # main guest normalized -> list of normalized plus ones
     main_guests = {}  # Store all main guests: normalized -> actual name
     all_guests = {}  # Store all guests: normalized -> actual name (for lookup)
     
-    # Read CSV and process guests
-    with open('ICCHalloweenParty_10-31_guests.csv', 'r') as f:
-        reader = csv.DictReader(f)
+    # Read CSV, keeping only guests with status "Going"
+    df = pd.read_csv('ICCHalloweenParty_10-31_guests.csv', usecols=['Name', 'Status', 'Is Plus One Of'], dtype='string', keep_default_na=False)
+    df = df[df['Status'].str.strip() == 'Going']
+    names = df['Name'].str.strip()
+    normalized_names = names.map(normalize_name)
+    plus_one_ofs = df['Is Plus One Of'].str.strip()
+    
+    # Check whitelist
+    blacklist = names[~normalized_names.isin(whitelist)].tolist()
+    
+    # Process guests
+    for name, normalized_name, plus_one_of in zip(names, normalized_names, plus_one_ofs):
+        all_guests[normalized_name] = name
         
-        for row in reader:
-            name = row['Name'].strip()
-            status = row['Status'].strip()
-            plus_one_of = row['Is Plus One Of'].strip()
-            
-            # Only consider guests with status "Going"
-            if status != 'Going':
-                continue
-            
-            normalized_name = normalize_name(name)
-            all_guests[normalized_name] = name
-            
-            # Check whitelist
-            if normalized_name not in whitelist:
-                blacklist.append(name)
-            
-            # Build guest structure
-            if plus_one_of:
-                # This is a plus one
-                main_guest_normalized = normalize_name(plus_one_of)
-                guest_structure[main_guest_normalized].append(name)
-            else:
-                # This is a main guest
-                main_guest_normalized = normalize_name(name)
-                main_guests[main_guest_normalized] = name
-                # Initialize with empty list if not already present
-                if main_guest_normalized not in guest_structure:
-                    guest_structure[main_guest_normalized] = []
+        # Build guest structure
+        if plus_one_of:
+            # This is a plus one
+            main_guest_normalized = normalize_name(plus_one_of)
+            guest_structure.setdefault(main_guest_normalized, []).append(name)
+            guest_structure_norm.setdefault(main_guest_normalized, []).append(normalized_name)
+        else:
+            # This is a main guest
+            main_guest_normalized = normalized_name
+            main_guests[main_guest_normalized] = name
+            guest_structure.setdefault(main_guest_normalized, [])
+            guest_structure_norm.setdefault(main_guest_normalized, [])
     
     # Parse payments
     payments, total_payments = parse_payments('payments.txt')
+    payment_keys = list(payments.keys())
     
-    # Price per guest
-    PRICE_PER_GUEST = 5.0
+    # Index payments by first word so first-name matches are a single dict lookup
+    payment_first_word = {k: first_word(k) for k in payments}
+    by_first_word = defaultdict(list)
+    for payment_name, word in payment_first_word.items():
+        by_first_word[word].append(payment_name)
     
-    # Track who has been accounted for
+    # Track who has been accounted for, and who has been verified as unpaid
     accounted_for = set()
-    unpaid = []
+    checked = set()
+    definitely_not_paid = []
     
     # Process each main guest and their plus ones
     for main_guest_normalized, plus_ones in guest_structure.items():
+        plus_ones_normalized = guest_structure_norm[main_guest_normalized]
         main_guest_name = main_guests.get(main_guest_normalized, all_guests.get(main_guest_normalized, main_guest_normalized.title()))
         
+        # No-pay guests without plus ones have nothing to pay for, so skip payment matching
+        if not plus_ones and main_guest_normalized in no_pay:
+            accounted_for.add(main_guest_normalized)
+            continue
+        
         # Get payment amount for this main guest - try exact match first
-        payment_amount = payments.get(main_guest_normalized, 0.0)
+        payment_amount = payments.get(main_guest_normalized, 0)
         
-        # If no exact match, try to find partial matches (in case of name variations)
-        if payment_amount == 0.0:
-            for payment_name, amount in payments.items():
-                # Check if payment name contains main guest name or vice versa
-                # Also check if first word of either name matches
-                main_first_word = main_guest_normalized.split()[0] if main_guest_normalized.split() else main_guest_normalized
-                payment_first_word = payment_name.split()[0] if payment_name.split() else payment_name
-                
-                if (main_guest_normalized in payment_name or 
-                    payment_name in main_guest_normalized or
-                    main_first_word == payment_first_word or
-                    main_first_word in payment_name or
-                    payment_first_word in main_guest_normalized):
-                    payment_amount = amount
-                    break
+        # If no exact match, try a first word match, then fuzzy matching (in case of name variations)
+        if payment_amount == 0:
+            candidates = by_first_word.get(first_word(main_guest_normalized))
+            if candidates:
+                # Several payers can share a first name, so take the closest one
+                match = process.extractOne(main_guest_normalized, candidates, scorer=fuzz.token_set_ratio, processor=utils.default_process)
+                payment_amount = payments[match[0]]
+            else:
+                match = process.extractOne(main_guest_normalized, payment_keys, scorer=fuzz.token_set_ratio, processor=utils.default_process, score_cutoff=MATCH_SCORE_CUTOFF)
+                if match is not None:
+                    payment_amount = payments[match[0]]
         
         # Calculate how many guests are covered by this payment
         # Each guest (main + plus ones) costs $5
-        total_guests = 1 + len(plus_ones)  # 1 for main guest + plus ones
-        guests_covered = int(payment_amount / PRICE_PER_GUEST)
+        guests_covered = payment_amount // PRICE_PER_GUEST_CENTS
         
         # Mark accounted guests
         if guests_covered > 0:
@@ -149,68 +189,53 @@ def main():
             accounted_for.add(main_guest_normalized)
             
             # Plus ones accounted for (up to the number covered)
-            for i in range(min(guests_covered - 1, len(plus_ones))):
-                plus_one_name = plus_ones[i]
-                accounted_for.add(normalize_name(plus_one_name))
-        
-        # Add unaccounted guests to unpaid list
-        if main_guest_normalized not in accounted_for:
-            unpaid.append(main_guest_name)
-        
-        for plus_one in plus_ones:
-            plus_one_normalized = normalize_name(plus_one)
-            if plus_one_normalized not in accounted_for:
-                unpaid.append(plus_one)
-    
-    # Double check unpaid list - verify they haven't paid
-    definitely_not_paid = []
-    
-    for unpaid_guest in unpaid:
-        unpaid_normalized = normalize_name(unpaid_guest)
-        # Check if they have any payment recorded (exact or partial match)
-        has_payment = unpaid_normalized in payments
+            accounted_for.update(plus_ones_normalized[:guests_covered - 1])
         
-        # Also check for partial matches (including first word matches)
-        if not has_payment:
-            unpaid_first_word = unpaid_normalized.split()[0] if unpaid_normalized.split() else unpaid_normalized
-            for payment_name in payments.keys():
-                payment_first_word = payment_name.split()[0] if payment_name.split() else payment_name
-                
-                if (unpaid_normalized in payment_name or 
-                    payment_name in unpaid_normalized or
-                    unpaid_first_word == payment_first_word or
-                    unpaid_first_word in payment_name or
-                    payment_first_word in unpaid_normalized):
-                    has_payment = True
-                    break
-        
-        if not has_payment:
-            # Check if guest is on no_pay list - if so, skip them
-            if unpaid_normalized not in no_pay:
-                definitely_not_paid.append(unpaid_guest)
+        # Double check unaccounted guests - verify they haven't paid
+        party = [(main_guest_name, main_guest_normalized)]
+        party.extend(zip(plus_ones, plus_ones_normalized))
+        for guest, guest_normalized in party:
+            # Skip accounted guests, guests on the no_pay list and guests already checked
+            if guest_normalized in accounted_for or guest_normalized in no_pay or guest_normalized in checked:
+                continue
+            checked.add(guest_normalized)
+            
+            # Check if they have any payment recorded (exact or partial match)
+            has_payment = guest_normalized in payments
+            
+            # Also check for first word and fuzzy matches (in case of name variations)
+            if not has_payment:
+                has_payment = first_word(guest_normalized) in by_first_word
+            
+            if not has_payment:
+                match = process.extractOne(guest_normalized, payment_keys, scorer=fuzz.token_set_ratio, processor=utils.default_process, score_cutoff=MATCH_SCORE_CUTOFF)
+                has_payment = match is not None
+            
+            if not has_payment:
+                definitely_not_paid.append(guest)
     
-    # Display results
-    print("=" * 60)
-    print("AUTHENTICATION RESULTS")
-    print("=" * 60)
+    # Display results (built up and written in one go)
+    out = []
+    out.append("=" * 60)
+    out.append("AUTHENTICATION RESULTS")
+    out.append("=" * 60)
     
-    print("\n📋 BLACKLIST (Not on whitelist):")
+    out.append("\n📋 BLACKLIST (Not on whitelist):")
     if blacklist:
-        for guest in blacklist:
-            print(f"  - {guest}")
+        out.extend(f"  - {guest}" for guest in blacklist)
     else:
-        print("  (None)")
+        out.append("  (None)")
     
-    print("\n❌ DEFINITELY NOT PAID (Unpaid and no payment record):")
+    out.append("\n❌ DEFINITELY NOT PAID (Unpaid and no payment record):")
     if definitely_not_paid:
-        for guest in definitely_not_paid:
-            print(f"  - {guest}")
+        out.extend(f"  - {guest}" for guest in definitely_not_paid)
     else:
-        print("  (None)")
+        out.append("  (None)")
     
-    print("\n" + "=" * 60)
-    print(f"Total payments: ${total_payments:.2f}")
-    print("\n" + "=" * 60)
+    out.append("\n" + "=" * 60)
+    out.append(f"Total payments: ${total_payments / 100:.2f}")
+    out.append("\n" + "=" * 60)
+    sys.stdout.write("\n".join(out) + "\n")
 if __name__ == "__main__":
     main()
 